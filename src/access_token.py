@@ -0,0 +1,81 @@
+import base64
+import hashlib
+import hmac
+import os
+import time
+from functools import lru_cache
+from typing import Optional
+
+import orjson
+
+API_KEY = os.getenv("LIVEKIT_API_KEY")
+API_SECRET = os.getenv("LIVEKIT_API_SECRET")
+
+if API_KEY is None:
+    raise ValueError("LIVEKIT_API_KEY is not defined")
+if API_SECRET is None:
+    raise ValueError("LIVEKIT_API_SECRET is not defined")
+
+# HMAC key for signing access tokens, encoded once instead of per token
+_API_SECRET_BYTES = API_SECRET.encode("utf-8")
+
+# Keyed HMAC-SHA256 state; copied per token so the key schedule runs only once
+_HMAC_BASE = hmac.new(_API_SECRET_BYTES, digestmod=hashlib.sha256)
+
+
+def _b64url(data: bytes) -> bytes:
+    """Base64url-encode without padding, as used in JWT segments."""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+# Access tokens are HS256 JWTs; the header never changes
+_JWT_HEADER_B64 = _b64url(b'{"alg":"HS256","typ":"JWT"}')
+
+# Access tokens are valid for 15 minutes
+_TTL_SECONDS = 900
+
+# Every participant gets the same video grants, only the room differs
+_VIDEO_GRANTS = {
+    "roomJoin": True,
+    "canPublish": True,
+    "canPublishData": True,
+    "canSubscribe": True,
+}
+
+
+@lru_cache(maxsize=64)
+def _room_config(agent_name: str) -> dict:
+    """Build the roomConfig claim dispatching agent_name, memoized per agent. Do not mutate."""
+    return {"agents": [{"agentName": agent_name}]}
+
+
+def create_participant_token(
+    identity: str,
+    name: str,
+    room_name: str,
+    agent_name: Optional[str] = None,
+) -> str:
+    """
+    Create a participant token for LiveKit.
+    The JWT is signed directly instead of building an api.AccessToken; the claims
+    are the same as AccessToken.to_jwt() produces for these grants.
+    """
+    now = int(time.time())
+    claims = {
+        "name": name,
+        "video": {**_VIDEO_GRANTS, "room": room_name},
+        "sub": identity,
+        "iss": API_KEY,
+        "nbf": now,
+        "exp": now + _TTL_SECONDS,
+    }
+
+    # TODO: Remove agent_name parameter
+    if agent_name is not None:
+        claims["roomConfig"] = _room_config(agent_name)
+
+    signing_input = _JWT_HEADER_B64 + b"." + _b64url(orjson.dumps(claims))
+    mac = _HMAC_BASE.copy()
+    mac.update(signing_input)
+    signature = mac.digest()
+    return (signing_input + b"." + _b64url(signature)).decode()
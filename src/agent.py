@@ -1,12 +1,15 @@
 import asyncio
 import json
 import logging
+import os
 import sys
 import uuid
 from dataclasses import dataclass, field
 from typing import Optional
 
+import orjson
 from dotenv import load_dotenv
+from livekit import rtc
 from livekit.agents import (
     Agent,
     AgentSession,
@@ -25,7 +28,9 @@ from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
 logger = logging.getLogger("agent")
 
-load_dotenv(".env.local")
+# Production (ENV=prod) gets its configuration from the real environment
+if os.getenv("ENV") != "prod":
+    load_dotenv(".env.local")
 
 # Available illustrations that can be displayed to users
 AVAILABLE_ILLUSTRATIONS = {
@@ -42,8 +47,39 @@ AVAILABLE_ILLUSTRATIONS = {
     # Add more illustrations here as they become available
 }
 
+# Show payloads identify the illustration by key; the FE resolves the URL from the
+# catalog it fetched once through the agent.illustrationsCatalog RPC. Keep sending
+# image_url as well until every frontend reads the key (set to "false" to drop it).
+ILLUSTRATION_PAYLOAD_INCLUDE_URL = (
+    os.getenv("ILLUSTRATION_PAYLOAD_INCLUDE_URL", "true").lower() == "true"
+)
+
+# The illustration table is static, so serialize the RPC payloads once up front
+_ILLUSTRATIONS_CATALOG_PAYLOAD = orjson.dumps(
+    {
+        key: {"url": illustration["url"], "description": illustration["description"]}
+        for key, illustration in AVAILABLE_ILLUSTRATIONS.items()
+    }
+).decode()
+for _key, _illustration in AVAILABLE_ILLUSTRATIONS.items():
+    _show_payload = {"state": "show", "key": _key}
+    if ILLUSTRATION_PAYLOAD_INCLUDE_URL:
+        _show_payload["image_url"] = _illustration["url"]
+    _illustration["_show_payload"] = orjson.dumps(_show_payload).decode()
+_HIDE_PAYLOAD = orjson.dumps({"state": "hidden"}).decode()
+_AVAILABLE_KEYS_STR = ", ".join(AVAILABLE_ILLUSTRATIONS.keys())
+
+# Seconds to wait for the FE to answer an illustration RPC once it acknowledged it
+ILLUSTRATION_RPC_TIMEOUT = 3.5
+# Hard limit on an illustration RPC, including the connection/ack phase
+ILLUSTRATION_RPC_TOTAL_TIMEOUT = 4.0
+RPC_TIMEOUT_ERROR_CODES = (
+    rtc.RpcError.ErrorCode.CONNECTION_TIMEOUT,
+    rtc.RpcError.ErrorCode.RESPONSE_TIMEOUT,
+)
+
 
-@dataclass
+@dataclass(slots=True)
 class UserInfo:
     """Class to represent a user information"""
 
@@ -52,7 +88,7 @@ class UserInfo:
     age: int | None
 
 
-@dataclass
+@dataclass(slots=True)
 class Component:
     """Class to represent a FE component"""
 
@@ -61,18 +97,22 @@ class Component:
     is_showed: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class UserData:
     """Class to store user data during a session"""
 
     ctx: Optional[JobContext] = None
+    participant_identity: Optional[str] = None
+    user_id: Optional[str] = None
     name: str = field(default_factory=str)
     age: int = field(default_factory=int)
     components: list[Component] = field(default_factory=list)
+    components_by_id: dict[str, Component] = field(default_factory=dict)
 
     def set_user_info(self, name: str, age: int) -> UserInfo:
         """Set user information"""
-        user_info = UserInfo(id=str(uuid.uuid4()), name=name, age=age)
+        self.user_id = str(uuid.uuid4())
+        user_info = UserInfo(id=self.user_id, name=name, age=age)
         self.name = name
         self.age = age
         return user_info
@@ -80,21 +120,28 @@ class UserData:
     def get_user_info(self) -> Optional[UserInfo]:
         """Get the user information (name and age)"""
         if self.name and (self.age is not None):
-            return UserInfo(id=str(uuid.uuid4()), name=self.name, age=self.age)
+            return UserInfo(id=self.user_id, name=self.name, age=self.age)
         return None
 
+    def get_participant_identity(self) -> Optional[str]:
+        """Get the identity of the client participant, resolved once per connection"""
+        if self.participant_identity is None and self.ctx and self.ctx.room:
+            # The first remote participant in the room should be the client
+            participant = next(iter(self.ctx.room.remote_participants.values()), None)
+            if participant:
+                self.participant_identity = participant.identity
+        return self.participant_identity
+
     def add_component(self, content: str) -> Component:
         """Add a new component to the collection"""
         component = Component(id=str(uuid.uuid4()), content=content)
         self.components.append(component)
+        self.components_by_id[component.id] = component
         return component
 
     def get_component(self, action_id: str) -> Optional[Component]:
         """Get a component by ID"""
-        for component in self.components:
-            if component.id == action_id:
-                return component
-        return None
+        return self.components_by_id.get(action_id)
 
     def toggle_component(self, action_id: str) -> Optional[Component]:
         """Toggle display of the component by ID"""
@@ -105,6 +152,29 @@ class UserData:
         return None
 
 
+async def perform_illustration_rpc(room: rtc.Room, participant_identity: str, payload: str) -> str:
+    """Send a client.showIllustration RPC and return the raw response.
+
+    perform_rpc's response_timeout only starts once the frontend acknowledged the
+    request, so the whole call is also bounded by ILLUSTRATION_RPC_TOTAL_TIMEOUT.
+    SDK timeouts are raised as asyncio.TimeoutError as well.
+    """
+    try:
+        return await asyncio.wait_for(
+            room.local_participant.perform_rpc(
+                destination_identity=participant_identity,
+                method="client.showIllustration",
+                payload=payload,
+                response_timeout=ILLUSTRATION_RPC_TIMEOUT,
+            ),
+            timeout=ILLUSTRATION_RPC_TOTAL_TIMEOUT,
+        )
+    except rtc.RpcError as e:
+        if e.code in RPC_TIMEOUT_ERROR_CODES:
+            raise asyncio.TimeoutError(e.message) from e
+        raise
+
+
 class Assistant(Agent):
     def __init__(self) -> None:
         super().__init__(
@@ -186,15 +256,10 @@ class Assistant(Agent):
             return "Created a component, but couldn't access the room to send it"
         room = userdata.ctx.room
 
-        # Get the first participant in the room (should be the client)
-        participants = room.remote_participants
-        if not participants:
+        # Get the client participant (the first participant in the room)
+        participant_identity = userdata.get_participant_identity()
+        if not participant_identity:
             return "Created a component, but no participants found to send it to"
-
-        # Get the first participant from the dictionary of remote participant
-        participant = next(iter(participants.values()), None)
-        if not participant:
-            return "Created a component, but couldn't get the first participant"
         payload = {
             "action": "show",
             "id": component.id,
@@ -203,10 +268,10 @@ class Assistant(Agent):
         }
 
         # Make sure payload is properly serialized
-        json_payload = json.dumps(payload)
-        logger.info(f"Sending component payload: {json_payload}")
+        json_payload = orjson.dumps(payload).decode()
+        logger.debug("Sending component payload: %s", json_payload)
         await room.local_participant.perform_rpc(
-            destination_identity=participant.identity,
+            destination_identity=participant_identity,
             method="client.component",
             payload=json_payload,
         )
@@ -231,22 +296,17 @@ class Assistant(Agent):
             return "Toggled the component, but couldn't access the room to send it"
         room = userdata.ctx.room
 
-        # Get the first participant in the room (should be the client)
-        participants = room.remote_participants
-        if not participants:
+        # Get the client participant (the first participant in the room)
+        participant_identity = userdata.get_participant_identity()
+        if not participant_identity:
             return "Toggled the component, but no participants found to send it to"
-
-        # Get the first participant from the dictionary of remote participants
-        participant = next(iter(participants.values()), None)
-        if not participant:
-            return "Toggled the component, but couldn't get the first participant."
         payload = {"action": "toggle", "id": component.id}
 
         # Make sure payload is properly serialized
-        json_payload = json.dumps(payload)
-        logger.info(f"Send toggle component payload: {json_payload}")
+        json_payload = orjson.dumps(payload).decode()
+        logger.debug("Send toggle component payload: %s", json_payload)
         await room.local_participant.perform_rpc(
-            destination_identity=participant.identity,
+            destination_identity=participant_identity,
             method="client.component",
             payload=json_payload,
         )
@@ -270,11 +330,9 @@ class Assistant(Agent):
 
         # Validate illustration key
         if illustration_key not in AVAILABLE_ILLUSTRATIONS:
-            available_keys = ", ".join(AVAILABLE_ILLUSTRATIONS.keys())
-            return f"I don't have an illustration called '{illustration_key}'. Available illustrations are: {available_keys}"
+            return f"I don't have an illustration called '{illustration_key}'. Available illustrations are: {_AVAILABLE_KEYS_STR}"
 
         illustration = AVAILABLE_ILLUSTRATIONS[illustration_key]
-        image_url = illustration["url"]
         description = illustration["description"]
 
         # Get the room from the userdata
@@ -282,33 +340,20 @@ class Assistant(Agent):
             return "Cannot show illustration: couldn't access the room"
         room = userdata.ctx.room
 
-        # Get the first participant in the room (should be the client)
-        participants = room.remote_participants
-        if not participants:
+        # Get the client participant (the first participant in the room)
+        participant_identity = userdata.get_participant_identity()
+        if not participant_identity:
             return "Cannot show illustration: no participants found in the room"
 
-        # Get the first participant from the dictionary of remote participants
-        participant = next(iter(participants.values()), None)
-        if not participant:
-            return "Cannot show illustration: couldn't get the first participant"
-
         # Prepare and send RPC to show the illustration
         try:
-            payload = json.dumps({"state": "show", "image_url": image_url})
-            logger.info(f"Sending show illustration payload: {payload}")
-
-            # Wrap RPC call with asyncio timeout to catch errors before Rust panic
-            result = await asyncio.wait_for(
-                room.local_participant.perform_rpc(
-                    destination_identity=participant.identity,
-                    method="client.showIllustration",
-                    payload=payload,
-                ),
-                timeout=4.0,  # Python timeout slightly longer than RPC timeout
-            )
+            payload = illustration["_show_payload"]
+            logger.debug("Sending show illustration payload: %s", payload)
+
+            result = await perform_illustration_rpc(room, participant_identity, payload)
 
             response = json.loads(result)
-            logger.info(f"[Illustration] Show result: {response}")
+            logger.debug("[Illustration] Show result: %s", response)
 
             if response.get("ok"):
                 desc_msg = f" showing {description}" if description else ""
@@ -337,33 +382,20 @@ class Assistant(Agent):
             return "Cannot hide illustration: couldn't access the room"
         room = userdata.ctx.room
 
-        # Get the first participant in the room (should be the client)
-        participants = room.remote_participants
-        if not participants:
+        # Get the client participant (the first participant in the room)
+        participant_identity = userdata.get_participant_identity()
+        if not participant_identity:
             return "Cannot hide illustration: no participants found in the room"
 
-        # Get the first participant from the dictionary of remote participants
-        participant = next(iter(participants.values()), None)
-        if not participant:
-            return "Cannot hide illustration: couldn't get the first participant"
-
         # Prepare and send RPC to hide the illustration
         try:
-            payload = json.dumps({"state": "hidden"})
-            logger.info(f"Sending hide illustration payload: {payload}")
-
-            # Wrap RPC call with asyncio timeout to catch errors before Rust panic
-            result = await asyncio.wait_for(
-                room.local_participant.perform_rpc(
-                    destination_identity=participant.identity,
-                    method="client.showIllustration",
-                    payload=payload,
-                ),
-                timeout=4.0,  # Python timeout slightly longer than RPC timeout
-            )
+            payload = _HIDE_PAYLOAD
+            logger.debug("Sending hide illustration payload: %s", payload)
+
+            result = await perform_illustration_rpc(room, participant_identity, payload)
 
             response = json.loads(result)
-            logger.info(f"[Illustration] Hide result: {response}")
+            logger.debug("[Illustration] Hide result: %s", response)
 
             if response.get("ok"):
                 return "I've hidden the illustration."
@@ -379,6 +411,35 @@ class Assistant(Agent):
             return "I encountered an error while trying to hide the illustration. The frontend may not be ready."
 
 
+def install_event_loop_policy() -> None:
+    """Replace the default asyncio event loop with a faster implementation.
+
+    uvloop is used by default. Set AVATAR_LOOP=rloop to try rloop, a Rust
+    event loop built on mio (Linux, install with the `rloop` extra); it falls
+    back to uvloop when rloop is not installed. Windows keeps the default loop.
+    """
+    if sys.platform.startswith("win"):
+        return
+
+    if os.getenv("AVATAR_LOOP") == "rloop":
+        try:
+            import rloop
+
+            asyncio.set_event_loop_policy(rloop.EventLoopPolicy())
+            return
+        except ImportError:
+            logger.warning("AVATAR_LOOP=rloop but rloop is not installed, using uvloop")
+
+    import uvloop
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
+# Installed at import time: job processes are started with spawn/forkserver and
+# re-import this module as __mp_main__, so the __main__ block never runs there
+install_event_loop_policy()
+
+
 def prewarm(proc: JobProcess):
     proc.userdata["vad"] = silero.VAD.load()
 
@@ -419,15 +480,12 @@ async def entrypoint(ctx: JobContext):
     # Register RPC method for listening button from FE
     async def handle_toggle_component(rpc_data):
         try:
-            logger.info(f"Received toggle component payload: {rpc_data}")
-
             # Extract the payload from the RpcInvocationData object
             payload_str = rpc_data.payload
-            logger.info(f"Extracted quiz submission string: {payload_str}")
+            logger.debug("Received toggle component payload: %s", payload_str)
 
-            # Parse the JSON payload
-            payload_data = json.loads(payload_str)
-            logger.info(f"Parsed clicked button data: {payload_data}")
+            # Parse the JSON payload (only the component ID is needed)
+            payload_data = orjson.loads(payload_str)
 
             action_id = payload_data.get("id")
 
@@ -435,7 +493,9 @@ async def entrypoint(ctx: JobContext):
                 component = userdata.toggle_component(action_id)
                 if component:
                     logger.info(
-                        f"Toggled component {action_id}, is_showed: {component.is_showed}"
+                        "Toggled component %s, is_showed: %s",
+                        action_id,
+                        component.is_showed,
                     )
                     # Send a message to the user via the agent
                     session.generate_reply(
@@ -453,6 +513,10 @@ async def entrypoint(ctx: JobContext):
             logger.error(f"Error handling button click: {e}")
             return f"error: {str(e)}"
 
+    # Register RPC method for the FE to fetch the illustration catalog once per session
+    async def handle_illustrations_catalog(rpc_data):
+        return _ILLUSTRATIONS_CATALOG_PAYLOAD
+
     # To use a realtime model instead of a voice pipeline, use the following session setup instead.
     # (Note: This is for the OpenAI Realtime API. For other providers, see https://docs.livekit.io/agents/models/realtime/))
     # 1. Install livekit-agents[openai]
@@ -489,6 +553,17 @@ async def entrypoint(ctx: JobContext):
     # Join the room first; starting room I/O before connect can crash the worker.
     await ctx.connect()
 
+    # Register RPC methods - The method names need to match exactly what the client is calling
+    # Register right after connecting (the local participant only exists once connected)
+    # so client calls don't race the session start up and fail with "method not found".
+    logger.info("Registering RPC methods")
+    ctx.room.local_participant.register_rpc_method(
+        "agent.toggleComponent", handle_toggle_component
+    )
+    ctx.room.local_participant.register_rpc_method(
+        "agent.illustrationsCatalog", handle_illustrations_catalog
+    )
+
     nc = None
     try:
         # BVC noise cancellation can be unstable on some Windows setups.
@@ -596,6 +671,13 @@ async def entrypoint(ctx: JobContext):
         except Exception as e:
             logger.error(f"Failed handling data_received event: {e}")
 
+    def _on_participant_disconnected(participant):
+        # Resolve the client again on the next tool call
+        if participant.identity == userdata.participant_identity:
+            userdata.participant_identity = None
+
+    ctx.room.on("participant_disconnected", _on_participant_disconnected)
+
     # Handle typed chat messages sent via LiveKit data packets
     try:
         ctx.room.on("data_received", _on_data_received)
@@ -603,12 +685,6 @@ async def entrypoint(ctx: JobContext):
     except Exception as e:
         logger.error(f"Failed to register data_received handler: {e}")
 
-    # Register RPC methods - The method names need to match exactly what the client is calling
-    logger.info("Registering RPC methods")
-    ctx.room.local_participant.register_rpc_method(
-        "agent.toggleComponent", handle_toggle_component
-    )
-
     # Do not speak on connect. The frontend will trigger the first message after a quiz set is selected.
 
 
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+
+import asyncpg
+
+logger = logging.getLogger("option_batcher")
+
+
+class QuestionOptionBatcher:
+    """
+    Coalesce concurrent question option lookups into a single query.
+
+    Every `load()` call made within `max_queue_time` seconds (or until
+    `max_batch_size` distinct questions are waiting) is answered by one
+    `WHERE question_id = ANY($1)` fetch against `question_options`,
+    instead of one query per question per request.
+    """
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        max_batch_size: int = 128,
+        max_queue_time: float = 0.005,
+    ) -> None:
+        self._pool = pool
+        self._max_batch_size = max_batch_size
+        self._max_queue_time = max_queue_time
+        self._pending: dict[str, list[asyncio.Future]] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        # The event loop only keeps weak references to tasks
+        self._tasks: set[asyncio.Task] = set()
+        # Flipped off when the question_options table does not exist yet
+        self.enabled = True
+
+    async def load(self, question_id: str) -> list[asyncpg.Record]:
+        """Return the option rows of a question, ordered by order_num."""
+        if not self.enabled:
+            return []
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(question_id, []).append(future)
+
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._max_queue_time, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.create_task(self._process_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _process_batch(self, batch: dict[str, list[asyncio.Future]]) -> None:
+        options: dict[str, list[asyncpg.Record]] = {}
+        try:
+            async with self._pool.acquire() as conn:
+                rows = await conn.fetch(
+                    """
+                    SELECT question_id, option_text, is_correct, order_num
+                    FROM question_options
+                    WHERE question_id = ANY($1::uuid[])
+                    ORDER BY question_id, order_num
+                    """,
+                    list(batch),
+                )
+        except asyncpg.UndefinedTableError:
+            logger.warning(
+                "question_options table not found, disabling option batching"
+            )
+            self.enabled = False
+            rows = []
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for row in rows:
+            options.setdefault(str(row["question_id"]), []).append(row)
+
+        for question_id, futures in batch.items():
+            question_options = options.get(question_id, [])
+            for future in futures:
+                if not future.done():
+                    future.set_result(question_options)
@@ -1,130 +1,182 @@
+import hashlib
+import logging
 import os
-import random
-from datetime import timedelta
+import secrets
+import ssl
+import sys
 from typing import Optional
 
 from dotenv import load_dotenv
 
-# Load environment variables FIRST before importing quiz_router
-load_dotenv(".env.local")
-
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from livekit import api
-from pydantic import BaseModel
+# Load environment variables FIRST before importing access_token and quiz_router.
+# Production (ENV=prod) gets its configuration from the real environment.
+if os.getenv("ENV") != "prod":
+    load_dotenv(".env.local")
+
+from fastapi import FastAPI, Response
+import orjson
+# Pydantic rejects typing.TypedDict before Python 3.12, so use the backport
+from typing_extensions import TypedDict
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from access_token import create_participant_token
 from quiz_router import router as quiz_router
 
+logger = logging.getLogger("server")
+
 app = FastAPI()
 
 # Include quiz router
 app.include_router(quiz_router)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+
+# Fixed CORS headers for the allow-everything policy with credentials, encoded
+# once. Browsers reject "*" on credentialed requests, so, like Starlette's
+# CORSMiddleware with allow_credentials=True, the request's Origin, method and
+# headers are echoed back instead.
+# Responses to requests without an Origin still vary on it for shared caches
+_VARY_ORIGIN_HEADERS = [(b"vary", b"Origin")]
+_CORS_HEADERS = [
+    (b"access-control-allow-credentials", b"true"),
+    *_VARY_ORIGIN_HEADERS,
+]
+_CORS_PREFLIGHT_HEADERS = [
+    (b"access-control-allow-credentials", b"true"),
+    (b"access-control-max-age", b"600"),
+    (b"vary", b"Origin, Access-Control-Request-Method, Access-Control-Request-Headers"),
+]
+
+
+class AllowAllCORSMiddleware:
+    """
+    CORS middleware for a policy that allows every origin, method and header,
+    with credentials. Appends fixed headers to each response and answers
+    preflight requests directly, without the per-request checks of Starlette's
+    CORSMiddleware.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        origin = request_headers.get(b"origin")
+
+        if origin is not None and scope["method"] == "OPTIONS":
+            requested_method = request_headers.get(b"access-control-request-method")
+            if requested_method is not None:
+                headers = [
+                    (b"access-control-allow-origin", origin),
+                    (b"access-control-allow-methods", requested_method),
+                    *_CORS_PREFLIGHT_HEADERS,
+                ]
+                requested_headers = request_headers.get(b"access-control-request-headers")
+                if requested_headers is not None:
+                    headers.append((b"access-control-allow-headers", requested_headers))
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 204,
+                        "headers": headers,
+                    }
+                )
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        if origin is None:
+            cors_headers = _VARY_ORIGIN_HEADERS
+        else:
+            cors_headers = [(b"access-control-allow-origin", origin), *_CORS_HEADERS]
+
+        async def send_with_cors(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *cors_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+
+app.add_middleware(AllowAllCORSMiddleware)
 
 LIVEKIT_URL = os.getenv("LIVEKIT_URL")
-API_KEY = os.getenv("LIVEKIT_API_KEY")
-API_SECRET = os.getenv("LIVEKIT_API_SECRET")
 
 if LIVEKIT_URL is None:
     raise ValueError("LIVEKIT_URL is not defined")
-if API_KEY is None:
-    raise ValueError("LIVEKIT_API_KEY is not defined")
-if API_SECRET is None:
-    raise ValueError("LIVEKIT_API_SECRET is not defined")
-
-
-class ConnectionDetails(BaseModel):
-    serverUrl: str  # noqa: N815
-    roomName: str  # noqa: N815
-    participantName: str  # noqa: N815
-    participantToken: str  # noqa: N815
-
-
-def create_participant_token(
-    identity: str,
-    name: str,
-    room_name: str,
-    agent_name: Optional[str] = None,
-) -> str:
-    """Create a participant token for LiveKit."""
-    # token = api.AccessToken(API_KEY, API_SECRET)
-    # token.with_identity(identity).with_name(identity).with_ttl(timedelta(minutes=15))
-    at = (
-        api.AccessToken(API_KEY, API_SECRET)
-        .with_identity(identity)
-        .with_name(name)
-        .with_ttl(timedelta(minutes=15))
-    )
-    grants = api.VideoGrants(
-        room=room_name,
-        room_join=True,
-        can_publish=True,
-        can_publish_data=True,
-        can_subscribe=True,
-    )
-    at.with_grants(grants)
 
-    # TODO: Remove agent_name parameter
-    if agent_name is not None:
-        room_config = api.RoomConfiguration(
-            agents=[api.RoomAgentDispatch(agent_name=agent_name)]
-        )
-        at.with_room_config(room_config)
+PARTICIPANT_NAME = "user"
+
+# Constant parts of the connection details JSON body. Room names and tokens are
+# generated from [A-Za-z0-9_.-] only, so they are spliced in without JSON escaping.
+_CONNECTION_DETAILS_PREFIX = (
+    b'{"serverUrl":'
+    + orjson.dumps(LIVEKIT_URL)
+    + b',"participantName":'
+    + orjson.dumps(PARTICIPANT_NAME)
+    + b',"roomName":"'
+)
+_CONNECTION_DETAILS_TOKEN = b'","participantToken":"'
+_CONNECTION_DETAILS_SUFFIX = b'"}'
+
+# Connection details are per-user credentials and must never be cached by proxies
+_NOSTORE_HEADERS = [
+    (b"content-type", b"application/json"),
+    (b"cache-control", b"no-store"),
+]
 
-    return at.to_jwt()
 
-# TODO: change to GET method
-@app.post("/api/connection-details")
-async def connection_details(request: Request):
+class ConnectionDetailsResponse(Response):
+    """
+    JSON response with the fixed connection details headers encoded once.
+    Only content-length is computed per response.
+    """
+
+    media_type = "application/json"
+
+    def init_headers(self, headers=None) -> None:
+        self.raw_headers = [(b"content-length", str(len(self.body)).encode()), *_NOSTORE_HEADERS]
+
+
+class ConnectionDetails(TypedDict):
+    """LiveKit connection details returned to the client."""
+
+    serverUrl: str
+    roomName: str
+    participantName: str
+    participantToken: str
+
+
+@app.get("/api/connection-details", response_model=ConnectionDetails)
+async def connection_details(agent_name: Optional[str] = None):
     """
     Return Livekit connection details to the client.
+    Optionally dispatch an agent to the room with the agent_name query parameter.
     """
-    try:
-        # TODO: Change the parsing to match GET method
-        # Parse agent configuration from request body
-        body = await request.json()
-        agent_name: Optional[str] = (
-            body.get("room_config", {}).get("agents", [{}])[0].get("agent_name")
-            if body.get("room_config", {}).get("agents")
-            else None
-        )
-
-        # Generate participant token
-        participant_name = "user"
-        participant_identity = f"voice_assistant_user_{random.randint(0, 10_000)}"
-        room_name = f"voice_assistant_room_{random.randint(0, 10_000)}"
-
-        # TODO: Remove agent name
-        participant_token = create_participant_token(
-            identity=participant_identity,
-            name=participant_name,
-            room_name=room_name,
-            agent_name=agent_name,
-        )
-
-        # Return connection details
-        data = ConnectionDetails(
-            serverUrl=LIVEKIT_URL,
-            roomName=room_name,
-            participantName=participant_name,
-            participantToken=participant_token,
-        )
-
-        return JSONResponse(
-            content=data.model_dump(),
-            headers={"Cache-Control": "no-store"},
-        )
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) from e
+    # Generate participant token
+    suffix = secrets.token_hex(4)
+    participant_identity = f"voice_assistant_user_{suffix}"
+    room_name = f"voice_assistant_room_{suffix}"
+
+    # TODO: Remove agent name
+    participant_token = create_participant_token(
+        identity=participant_identity,
+        name=PARTICIPANT_NAME,
+        room_name=room_name,
+        agent_name=agent_name,
+    )
+
+    # Return connection details. All fields are server generated, so the
+    # ConnectionDetails type only documents the response and is not validated.
+    body = (
+        _CONNECTION_DETAILS_PREFIX
+        + room_name.encode()
+        + _CONNECTION_DETAILS_TOKEN
+        + participant_token.encode()
+        + _CONNECTION_DETAILS_SUFFIX
+    )
+    return ConnectionDetailsResponse(body)
 
 
 @app.get("/")
@@ -135,4 +187,17 @@ async def root():
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Token signing is HMAC-SHA256; OpenSSL 1.1.1+ uses the CPU's SHA extensions
+    logging.basicConfig(level=logging.INFO)
+    logger.info("SHA-256 backend: %s, %s", hashlib.sha256.__name__, ssl.OPENSSL_VERSION)
+
+    # uvloop is not available on Windows; use the default asyncio loop there.
+    # The app is passed as an import string so uvicorn can spawn worker processes.
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="asyncio" if sys.platform.startswith("win") else "uvloop",
+        http="httptools",
+        workers=max(2, os.cpu_count() or 1),
+    )
@@ -0,0 +1,6 @@
+import os
+
+# access_token and server read their LiveKit settings at import time
+os.environ.setdefault("LIVEKIT_URL", "wss://test.livekit.cloud")
+os.environ.setdefault("LIVEKIT_API_KEY", "test-api-key")
+os.environ.setdefault("LIVEKIT_API_SECRET", "test-api-secret-0123456789abcdef")
@@ -0,0 +1,60 @@
+import base64
+import json
+
+import pytest
+from livekit import api
+
+from access_token import API_KEY, API_SECRET, create_participant_token
+
+
+def _payload(token: str) -> dict:
+    segment = token.split(".")[1]
+    return json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+
+
+def test_token_verifies_with_livekit() -> None:
+    token = create_participant_token(
+        identity="voice_assistant_user_1",
+        name="user",
+        room_name="voice_assistant_room_1",
+    )
+
+    claims = api.TokenVerifier(API_KEY, API_SECRET).verify(token)
+
+    assert claims.identity == "voice_assistant_user_1"
+    assert claims.name == "user"
+    assert claims.video.room == "voice_assistant_room_1"
+    assert claims.video.room_join
+    assert claims.video.can_publish
+    assert claims.video.can_publish_data
+    assert claims.video.can_subscribe
+    assert claims.room_config is None
+
+    payload = _payload(token)
+    assert payload["iss"] == API_KEY
+    assert payload["exp"] - payload["nbf"] == 900
+
+
+def test_token_dispatches_agent() -> None:
+    token = create_participant_token(
+        identity="voice_assistant_user_1",
+        name="user",
+        room_name="voice_assistant_room_1",
+        agent_name="tutor",
+    )
+
+    claims = api.TokenVerifier(API_KEY, API_SECRET).verify(token)
+
+    assert claims.video.room == "voice_assistant_room_1"
+    assert claims.room_config.agents[0].agent_name == "tutor"
+
+
+def test_token_rejected_with_another_secret() -> None:
+    token = create_participant_token(
+        identity="voice_assistant_user_1",
+        name="user",
+        room_name="voice_assistant_room_1",
+    )
+
+    with pytest.raises(Exception, match="Signature verification failed"):
+        api.TokenVerifier(API_KEY, API_SECRET + "-other").verify(token)
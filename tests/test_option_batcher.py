@@ -0,0 +1,115 @@
+import asyncio
+import uuid
+
+import asyncpg
+import pytest
+
+from option_batcher import QuestionOptionBatcher
+
+Q1 = str(uuid.uuid4())
+Q2 = str(uuid.uuid4())
+
+
+class _FakeConnection:
+    def __init__(self, rows: list[dict] | None = None, error: Exception | None = None):
+        self.rows = rows or []
+        self.error = error
+        self.calls: list[list[str]] = []
+
+    async def fetch(self, query: str, question_ids: list[str]) -> list[dict]:
+        self.calls.append(question_ids)
+        if self.error is not None:
+            raise self.error
+        return [row for row in self.rows if str(row["question_id"]) in question_ids]
+
+
+class _FakePool:
+    def __init__(self, conn: _FakeConnection):
+        self.conn = conn
+
+    def acquire(self):
+        conn = self.conn
+
+        class _Acquire:
+            async def __aenter__(self):
+                return conn
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Acquire()
+
+
+def _option(
+    question_id: str, text: str, order_num: int, is_correct: bool = False
+) -> dict:
+    return {
+        "question_id": uuid.UUID(question_id),
+        "option_text": text,
+        "is_correct": is_correct,
+        "order_num": order_num,
+    }
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_share_one_query() -> None:
+    conn = _FakeConnection(
+        rows=[
+            _option(Q1, "A", 1, is_correct=True),
+            _option(Q1, "B", 2),
+            _option(Q2, "C", 1),
+        ]
+    )
+    batcher = QuestionOptionBatcher(_FakePool(conn))
+
+    q1, q1_again, q2, missing = await asyncio.gather(
+        batcher.load(Q1),
+        batcher.load(Q1),
+        batcher.load(Q2),
+        batcher.load(str(uuid.uuid4())),
+    )
+
+    assert len(conn.calls) == 1
+    assert [row["option_text"] for row in q1] == ["A", "B"]
+    assert q1_again == q1
+    assert [row["option_text"] for row in q2] == ["C"]
+    assert missing == []
+    assert not batcher._tasks
+
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_without_waiting() -> None:
+    conn = _FakeConnection()
+    batcher = QuestionOptionBatcher(
+        _FakePool(conn), max_batch_size=2, max_queue_time=60
+    )
+
+    await asyncio.wait_for(
+        asyncio.gather(batcher.load(Q1), batcher.load(Q2)), timeout=1
+    )
+
+    assert conn.calls == [[Q1, Q2]]
+
+
+@pytest.mark.asyncio
+async def test_missing_table_disables_batching() -> None:
+    conn = _FakeConnection(error=asyncpg.UndefinedTableError("question_options"))
+    batcher = QuestionOptionBatcher(_FakePool(conn))
+
+    assert await batcher.load(Q1) == []
+    assert not batcher.enabled
+    assert await batcher.load(Q2) == []
+    assert len(conn.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_query_errors_reach_every_waiter() -> None:
+    conn = _FakeConnection(error=asyncpg.PostgresError("boom"))
+    batcher = QuestionOptionBatcher(_FakePool(conn))
+
+    results = await asyncio.gather(
+        batcher.load(Q1), batcher.load(Q2), return_exceptions=True
+    )
+
+    assert all(isinstance(result, asyncpg.PostgresError) for result in results)
+    assert batcher.enabled
@@ -0,0 +1,191 @@
+import asyncio
+import uuid
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from redis.exceptions import RedisError
+
+import quiz_router
+
+QUESTION_SET_ID = uuid.uuid4()
+QUESTION_SET_ROWS = [
+    {
+        "id": QUESTION_SET_ID,
+        "name": "Geometry",
+        "description": None,
+        "question_count": 3,
+    }
+]
+
+
+class _FakeRedis:
+    def __init__(self, data: dict[str, bytes] | None = None, error: bool = False):
+        self.data = dict(data or {})
+        self.error = error
+        self.setex_calls: list[tuple[str, int]] = []
+
+    async def get(self, key: str) -> bytes | None:
+        if self.error:
+            raise RedisError("redis is down")
+        return self.data.get(key)
+
+    async def setex(self, key: str, ttl: int, body: bytes) -> None:
+        if self.error:
+            raise RedisError("redis is down")
+        self.setex_calls.append((key, ttl))
+        self.data[key] = body
+
+    async def aclose(self) -> None:
+        pass
+
+
+class _FakeConnection:
+    async def fetch(self, query: str, *args) -> list[dict]:
+        return QUESTION_SET_ROWS
+
+
+class _FakePool:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self):
+        pool = self
+
+        class _Acquire:
+            async def __aenter__(self):
+                pool.acquired += 1
+                return _FakeConnection()
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Acquire()
+
+    async def close(self) -> None:
+        pass
+
+
+class _CreatePool:
+    """Stand-in for asyncpg.create_pool that records calls and can fail."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = 0
+        self.pool = _FakePool()
+
+    async def __call__(self, *args, **kwargs) -> _FakePool:
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.calls <= self.failures:
+            raise ConnectionRefusedError("postgres is down")
+        return self.pool
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    def make(redis: _FakeRedis, create_pool: _CreatePool) -> TestClient:
+        monkeypatch.setattr(
+            quiz_router.Redis, "from_url", lambda *args, **kwargs: redis
+        )
+        monkeypatch.setattr(quiz_router.asyncpg, "create_pool", create_pool)
+        app = FastAPI()
+        app.include_router(quiz_router.router)
+        return TestClient(app)
+
+    return make
+
+
+def test_cache_hit_skips_postgres(make_client) -> None:
+    cached = b'[{"id":"cached"}]'
+    redis = _FakeRedis({quiz_router.QUESTION_SETS_CACHE_KEY: cached})
+    create_pool = _CreatePool()
+
+    with make_client(redis, create_pool) as client:
+        response = client.get("/api/quiz/question-sets")
+
+    assert response.status_code == 200
+    assert response.content == cached
+    assert create_pool.calls == 0
+    assert create_pool.pool.acquired == 0
+
+
+def test_cache_miss_reads_postgres_and_stores_body(make_client) -> None:
+    redis = _FakeRedis()
+    create_pool = _CreatePool()
+
+    with make_client(redis, create_pool) as client:
+        response = client.get("/api/quiz/question-sets")
+
+    assert response.status_code == 200
+    assert orjson.loads(response.content) == [
+        {
+            "id": str(QUESTION_SET_ID),
+            "name": "Geometry",
+            "description": "",
+            "questionCount": 3,
+        }
+    ]
+    assert create_pool.pool.acquired == 1
+    assert redis.setex_calls == [
+        (quiz_router.QUESTION_SETS_CACHE_KEY, quiz_router.QUESTION_SETS_CACHE_TTL)
+    ]
+    assert redis.data[quiz_router.QUESTION_SETS_CACHE_KEY] == response.content
+
+
+def test_redis_errors_fall_through_to_postgres(make_client) -> None:
+    redis = _FakeRedis(error=True)
+    create_pool = _CreatePool()
+
+    with make_client(redis, create_pool) as client:
+        response = client.get("/api/quiz/question-sets")
+
+    assert response.status_code == 200
+    assert orjson.loads(response.content)[0]["id"] == str(QUESTION_SET_ID)
+    assert create_pool.pool.acquired == 1
+
+
+def test_question_set_cache_hit_skips_postgres(make_client) -> None:
+    cached = b'{"questionSetId":"cached","questionSetName":"Geometry","questions":[]}'
+    key = quiz_router.question_set_cache_key(str(QUESTION_SET_ID), "Essay")
+    redis = _FakeRedis({key: cached})
+    create_pool = _CreatePool()
+
+    with make_client(redis, create_pool) as client:
+        response = client.get(
+            f"/api/quiz/question-set/{QUESTION_SET_ID}",
+            params={"question_types": "Essay"},
+        )
+
+    assert response.status_code == 200
+    assert response.content == cached
+    assert create_pool.calls == 0
+
+
+def test_pool_failure_returns_503_and_next_request_retries(make_client) -> None:
+    create_pool = _CreatePool(failures=1)
+
+    with make_client(_FakeRedis(), create_pool) as client:
+        failed = client.get("/api/quiz/question-sets")
+        retried = client.get("/api/quiz/question-sets")
+
+    assert failed.status_code == 503
+    assert failed.json() == {"detail": "Database unavailable"}
+    assert retried.status_code == 200
+    assert create_pool.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_requests_create_one_pool(monkeypatch) -> None:
+    create_pool = _CreatePool()
+    monkeypatch.setattr(quiz_router.asyncpg, "create_pool", create_pool)
+    app = FastAPI()
+    app.state.pg = None
+    app.state.pg_lock = asyncio.Lock()
+
+    pools = await asyncio.gather(*(quiz_router.get_pool(app) for _ in range(5)))
+
+    assert create_pool.calls == 1
+    assert all(pool is create_pool.pool for pool in pools)
+    assert app.state.option_batcher is not None
@@ -0,0 +1,99 @@
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from livekit import api
+
+import server
+from access_token import API_KEY, API_SECRET
+
+
+@pytest.fixture
+def client():
+    with TestClient(server.app) as client:
+        yield client
+
+
+def test_connection_details(client: TestClient) -> None:
+    response = client.get("/api/connection-details")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["cache-control"] == "no-store"
+    assert int(response.headers["content-length"]) == len(response.content)
+
+    details = orjson.loads(response.content)
+    assert details["serverUrl"] == server.LIVEKIT_URL
+    assert details["participantName"] == server.PARTICIPANT_NAME
+
+    claims = api.TokenVerifier(API_KEY, API_SECRET).verify(details["participantToken"])
+    assert claims.video.room == details["roomName"]
+    assert claims.room_config is None
+
+
+def test_connection_details_dispatches_agent(client: TestClient) -> None:
+    response = client.get("/api/connection-details", params={"agent_name": "tutor"})
+
+    details = orjson.loads(response.content)
+    claims = api.TokenVerifier(API_KEY, API_SECRET).verify(details["participantToken"])
+    assert claims.room_config.agents[0].agent_name == "tutor"
+
+
+def test_connection_details_are_unique_per_request(client: TestClient) -> None:
+    first = orjson.loads(client.get("/api/connection-details").content)
+    second = orjson.loads(client.get("/api/connection-details").content)
+
+    assert first["roomName"] != second["roomName"]
+    assert first["participantToken"] != second["participantToken"]
+
+
+def test_cors_echoes_origin_with_credentials(client: TestClient) -> None:
+    response = client.get(
+        "/api/connection-details", headers={"Origin": "https://app.example.com"}
+    )
+
+    assert response.headers["access-control-allow-origin"] == "https://app.example.com"
+    assert response.headers["access-control-allow-credentials"] == "true"
+    assert response.headers["vary"] == "Origin"
+    assert response.headers["cache-control"] == "no-store"
+
+
+def test_no_cors_headers_without_origin(client: TestClient) -> None:
+    response = client.get("/")
+
+    assert "access-control-allow-origin" not in response.headers
+    assert "access-control-allow-credentials" not in response.headers
+    assert response.headers["vary"] == "Origin"
+
+
+def test_cors_preflight_echoes_request(client: TestClient) -> None:
+    response = client.options(
+        "/api/connection-details",
+        headers={
+            "Origin": "https://app.example.com",
+            "Access-Control-Request-Method": "GET",
+            "Access-Control-Request-Headers": "authorization, content-type",
+        },
+    )
+
+    assert response.status_code == 204
+    assert response.headers["access-control-allow-origin"] == "https://app.example.com"
+    assert response.headers["access-control-allow-credentials"] == "true"
+    assert response.headers["access-control-allow-methods"] == "GET"
+    assert (
+        response.headers["access-control-allow-headers"]
+        == "authorization, content-type"
+    )
+    assert response.headers["vary"].startswith("Origin")
+
+
+def test_cors_preflight_without_requested_headers(client: TestClient) -> None:
+    response = client.options(
+        "/api/connection-details",
+        headers={
+            "Origin": "https://app.example.com",
+            "Access-Control-Request-Method": "GET",
+        },
+    )
+
+    assert response.status_code == 204
+    assert "access-control-allow-headers" not in response.headers